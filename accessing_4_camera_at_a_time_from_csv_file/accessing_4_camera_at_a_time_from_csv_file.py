@@ -1,131 +1,69 @@
-import gi
 import csv
+import os
+import sys
 
-# Import GStreamer bindings for Python
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GLib
+# The compositor grid and its camera handling are shared by the grid players
+# and live in multicam_common.py at the repository root (importing it also
+# initializes GStreamer)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from multicam_common import CompositorGridPlayer, parse_latency
 
-class MultiCameraRTSPPlayer:
+class MultiCameraRTSPPlayer(CompositorGridPlayer):
     """
     A class to handle RTSP streaming for multiple cameras using GStreamer.
     The class creates a 2x2 grid of video streams from 4 RTSP cameras.
     """
-    def __init__(self, cameras):
+    def __init__(self, cameras, display_size=None):
         """
         Initialize the MultiCameraRTSPPlayer with camera details and set up the GStreamer pipeline.
 
-        :param cameras: List of tuples containing (username, password, ip_address) for 4 cameras.
+        :param cameras: List of tuples containing (username, password, ip_address, latency) for 4 cameras.
+        :param display_size: Optional (width, height) of the displayed output; defaults to the size of the grid.
         """
-        # Initialize GStreamer
-        Gst.init(None)
+        super().__init__(2, 2, display_size)
 
-        # Build the GStreamer pipeline for multiple cameras
-        pipeline_str = self.build_pipeline(cameras)
-        
-        # Print the constructed pipeline string for debugging purposes
-        print(f"Pipeline: {pipeline_str}")
-
-        # Create the GStreamer pipeline
-        self.pipeline = Gst.parse_launch(pipeline_str)
-
-        # Set up the GStreamer bus to listen for messages from the pipeline
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect("message", self.on_message)
-
-    def build_pipeline(self, cameras):
-        """
-        Build the GStreamer pipeline string to display multiple RTSP streams in a 2x2 grid.
-
-        :param cameras: List of tuples containing (username, password, ip_address) for 4 cameras.
-        :return: GStreamer pipeline string.
-        """
-        sources = ""  # Holds RTSP sources
-        sinks = ""    # Holds compositor sink configurations
-        
-        # Loop through each camera and construct the source and sink elements
-        for i, (username, password, ip_address) in enumerate(cameras):
-            # Construct RTSP source URL
-            rtsp_url = f"rtsp://{username}:{password}@{ip_address}"
-            
-            # Add RTSP source to the pipeline
-            sources += f'rtspsrc location="{rtsp_url}" latency=200 ! rtph265depay ! h265parse ! nvv4l2decoder ! videoconvert ! comp.sink_{i} '
-            
-            # Calculate position for the 2x2 grid
-            xpos = (i % 2) * 640  # Horizontal position: 0 or 640
-            ypos = (i // 2) * 360  # Vertical position: 0 or 360
-            
-            # Configure compositor sink positions
-            sinks += f'sink_{i}::xpos={xpos} sink_{i}::ypos={ypos} sink_{i}::width=640 sink_{i}::height=360 '
-        
-        # Combine sources and sinks to create the complete pipeline
-        pipeline_str = f'{sources}nvcompositor name=comp {sinks}! nv3dsink'
-        return pipeline_str
-
-    def on_message(self, bus, message):
-        """
-        Handle messages from the GStreamer bus, such as errors and end-of-stream events.
-
-        :param bus: The GStreamer bus
-        :param message: The message received from the bus
-        """
-        msg_type = message.type
-        if msg_type == Gst.MessageType.EOS:
-            # Handle end-of-stream (EOS) message
-            print("End-of-stream (EOS) received. Shutting down...")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-        elif msg_type == Gst.MessageType.ERROR:
-            # Handle pipeline errors
-            err, debug_info = message.parse_error()
-            print(f"Error: {err}, Debug info: {debug_info}")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-
-    def start(self):
-        """
-        Start the GStreamer pipeline and enter the GLib main loop to keep the application running.
-        """
-        # Set the pipeline to the PLAYING state
-        self.pipeline.set_state(Gst.State.PLAYING)
-        print("Pipeline started, playing the RTSP streams...")
-        
-        # Start the GLib main loop to keep the application running
-        self.loop = GLib.MainLoop()
-        try:
-            self.loop.run()
-        except KeyboardInterrupt:
-            # Gracefully handle Ctrl+C interruption
-            print("\nKeyboard interrupt received, stopping the pipeline...")
-            self.quit_main_loop()
-
-    def quit_main_loop(self):
-        """
-        Stop the GLib main loop and reset the GStreamer pipeline to NULL state.
-        """
-        if hasattr(self, 'loop'):
-            self.loop.quit()  # Quit the GLib main loop
-        self.pipeline.set_state(Gst.State.NULL)  # Stop the GStreamer pipeline
-        print("Pipeline stopped and GLib main loop exited.")
+        # Loop through each camera and show it in its grid slot
+        for i, (username, password, ip_address, latency) in enumerate(cameras):
+            self.add_camera(f"rtsp://{username}:{password}@{ip_address}", ip_address, i, latency)
 
 def read_camera_from_csv(file_path):
     """
-    Reads camera details (username, password, IP address) from a CSV file.
+    Reads camera details (username, password, IP address, optional latency) from a CSV file.
 
     :param file_path: Path to the CSV file.
     :return: List of tuples with camera details.
     """
     cameras = []
     try:
-        # Open the CSV file
-        with open(file_path, 'r') as csv_file:
-            reader = csv.DictReader(csv_file)
-            # Read each row and extract camera details
+        # Open the CSV file; newline='' leaves line endings to the csv module
+        # and the large buffer reads a big inventory in a few syscalls
+        with open(file_path, 'r', newline='', buffering=1 << 20, encoding='utf-8') as csv_file:
+            reader = csv.reader(csv_file)
+            # Resolve the column positions once from the header row
+            header = next(reader, None)
+            if header is None:
+                # An empty file has no header row and therefore no cameras
+                print(f"The CSV file {file_path} is empty.")
+                return cameras
+            i_user, i_pass, i_addr = header.index('username'), header.index('password'), header.index('ip_address')
+            # The latency column is optional; empty or invalid cells fall back
+            # to the default for that camera only
+            i_latency = header.index('latency') if 'latency' in header else None
+            # A row must reach the username, password and address columns; a
+            # missing trailing latency cell counts as empty
+            required = max(i_user, i_pass, i_addr) + 1
+            # Read each non-empty row and extract camera details
             for row in reader:
-                username = row['username']
-                password = row['password']
-                ip_address = row['ip_address']
-                cameras.append((username, password, ip_address))
+                if not row:
+                    continue
+                if len(row) < required:
+                    # Skip the short row only, instead of losing every camera
+                    print(f"Skipping {file_path} line {reader.line_num}: "
+                          f"expected at least {required} columns, got {len(row)}")
+                    continue
+                latency = row[i_latency] if i_latency is not None and i_latency < len(row) else ""
+                cameras.append((row[i_user], row[i_pass], row[i_addr],
+                                parse_latency(latency, f"{file_path} line {reader.line_num}")))
     except Exception as e:
         # Handle errors in reading the CSV file
         print(f"Error reading CSV file: {e}")
@@ -1,145 +1,77 @@
-import gi
 import csv
+import os
+import sys
 
-# Ensure the correct version of GStreamer is used
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GLib
+# The compositor grid and its camera handling are shared by the grid players
+# and live in multicam_common.py at the repository root (importing it also
+# initializes GStreamer)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from multicam_common import CompositorGridPlayer, parse_latency
 
-class MultiCameraRTSPPlayer:
+class MultiCameraRTSPPlayer(CompositorGridPlayer):
     """
     A class to handle multiple RTSP camera streams and display them in a grid layout using GStreamer.
     """
-    def __init__(self, cameras, rows, columns):
+    def __init__(self, cameras, rows, columns, display_size=None):
         """
         Initialize the MultiCameraRTSPPlayer.
 
-        :param cameras: List of tuples containing (username, password, ip_address) for each camera.
+        :param cameras: List of tuples containing (username, password, ip_address, latency) for each camera.
         :param rows: Number of rows in the grid layout.
         :param columns: Number of columns in the grid layout.
+        :param display_size: Optional (width, height) of the displayed output; defaults to the size of the grid.
         """
-        # Initialize GStreamer
-        Gst.init(None)
+        super().__init__(rows, columns, display_size)
 
-        self.rows = rows
-        self.columns = columns
-        self.cameras = cameras
-
-        # Build the GStreamer pipeline string based on the number of cameras and grid layout
-        pipeline_str = self.build_pipeline()
-        print(f"Pipeline: {pipeline_str}")
-
-        # Create the GStreamer pipeline from the pipeline string
-        self.pipeline = Gst.parse_launch(pipeline_str)
-
-        # Set up the bus to listen for messages from the pipeline
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect("message", self.on_message)
-
-    def build_pipeline(self):
-        """
-        Constructs the GStreamer pipeline string based on the provided cameras and grid layout.
-
-        :return: A string representing the GStreamer pipeline.
-        """
-        sources = ""  # String to hold all source elements
-        sinks = ""    # String to hold all sink elements
+        # Keep each camera field in its own list so every pass over the cameras
+        # only walks the field it needs
+        self.urls = [f"rtsp://{camera[0]}:{camera[1]}@{camera[2]}" for camera in cameras]
+        self.ips = [camera[2] for camera in cameras]
+        self.latencies = [camera[3] for camera in cameras]
 
         # Calculate the maximum number of cameras based on the grid size (rows * columns)
-        camera_count = self.rows * self.columns
+        # and capped up front by the number of cameras available
+        camera_count = min(self.rows * self.columns, len(self.ips))
 
         for i in range(camera_count):
-            if i >= len(self.cameras):
-                # Stop adding sources if there are not enough cameras
-                break
-
-            # Extract camera credentials and IP address
-            username, password, ip_address = self.cameras[i]
-            rtsp_url = f"rtsp://{username}:{password}@{ip_address}"
-
-            # Append the RTSP source pipeline for each camera
-            sources += (
-                f'rtspsrc location="{rtsp_url}" latency=200 ! '
-                f'rtph265depay ! h265parse ! nvv4l2decoder ! videoconvert ! '
-                f'comp.sink_{i} '
-            )
-
-            # Calculate the position of each video in the grid
-            xpos = (i % self.columns) * 640  # Horizontal position based on column
-            ypos = (i // self.columns) * 360  # Vertical position based on row
-
-            # Define sink properties for positioning and sizing
-            sinks += (
-                f'sink_{i}::xpos={xpos} sink_{i}::ypos={ypos} '
-                f'sink_{i}::width=640 sink_{i}::height=360 '
-            )
-
-        # Complete the pipeline by adding a compositor and the final video sink
-        pipeline_str = f'{sources}nvcompositor name=comp {sinks}! nv3dsink'
-        return pipeline_str
-
-    def on_message(self, bus, message):
-        """
-        Handle messages from the GStreamer bus.
-
-        :param bus: The GStreamer bus.
-        :param message: The message from the bus.
-        """
-        msg_type = message.type
-        if msg_type == Gst.MessageType.EOS:
-            # Handle End-of-Stream message
-            print("End-of-stream (EOS) received. Shutting down...")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-        elif msg_type == Gst.MessageType.ERROR:
-            # Handle error messages
-            err, debug_info = message.parse_error()
-            print(f"Error: {err}, Debug info: {debug_info}")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-
-    def start(self):
-        """
-        Start the GStreamer pipeline and the GLib main loop to begin streaming.
-        """
-        # Set the pipeline to the PLAYING state to start processing
-        self.pipeline.set_state(Gst.State.PLAYING)
-        print("Pipeline started, playing the RTSP streams...")
-
-        # Initialize and run the GLib main loop to keep the application active
-        self.loop = GLib.MainLoop()
-        try:
-            self.loop.run()
-        except KeyboardInterrupt:
-            # Handle user interruption (e.g., Ctrl+C)
-            print("\nKeyboard interrupt received, stopping the pipeline...")
-            self.quit_main_loop()
-
-    def quit_main_loop(self):
-        """
-        Stop the GLib main loop and set the GStreamer pipeline to NULL state.
-        """
-        if hasattr(self, 'loop'):
-            self.loop.quit()
-        self.pipeline.set_state(Gst.State.NULL)
-        print("Pipeline stopped and GLib main loop exited.")
+            self.add_camera(self.urls[i], self.ips[i], i, self.latencies[i])
 
 def read_camera_from_csv(file_path):
     """
     Reads camera details from a CSV file.
 
     :param file_path: Path to the CSV file containing camera details.
-    :return: A list of tuples with (username, password, ip_address) for each camera.
+    :return: A list of tuples with (username, password, ip_address, latency) for each camera.
     """
     cameras = []
     try:
-        with open(file_path, 'r') as csv_file:
-            reader = csv.DictReader(csv_file)
+        # newline='' leaves line endings to the csv module and the large
+        # buffer reads a big inventory in a few syscalls
+        with open(file_path, 'r', newline='', buffering=1 << 20, encoding='utf-8') as csv_file:
+            reader = csv.reader(csv_file)
+            header = next(reader, None)
+            if header is None:
+                # An empty file has no header row and therefore no cameras
+                print(f"The CSV file {file_path} is empty.")
+                return cameras
+            i_user, i_pass, i_addr = header.index('username'), header.index('password'), header.index('ip_address')
+            # The latency column is optional; empty or invalid cells fall back
+            # to the default for that camera only
+            i_latency = header.index('latency') if 'latency' in header else None
+            # A row must reach the username, password and address columns; a
+            # missing trailing latency cell counts as empty
+            required = max(i_user, i_pass, i_addr) + 1
             for row in reader:
-                username = row['username']
-                password = row['password']
-                ip_address = row['ip_address']
-                cameras.append((username, password, ip_address))
+                if not row:
+                    continue
+                if len(row) < required:
+                    # Skip the short row only, instead of losing every camera
+                    print(f"Skipping {file_path} line {reader.line_num}: "
+                          f"expected at least {required} columns, got {len(row)}")
+                    continue
+                latency = row[i_latency] if i_latency is not None and i_latency < len(row) else ""
+                cameras.append((row[i_user], row[i_pass], row[i_addr],
+                                parse_latency(latency, f"{file_path} line {reader.line_num}")))
     except Exception as e:
         print(f"Error reading CSV file: {e}")
     return cameras
@@ -154,13 +86,20 @@ if __name__ == "__main__":
     if not cameras:
         print("No cameras found in the CSV file.")
     else:
-        # Prompt the user to input the number of rows and columns for the grid layout
+        # Take the grid size from the command line when given, so the player can
+        # be started unattended; otherwise prompt the user for rows and columns
         try:
-            rows = int(input("Enter the number of rows (n): "))
-            columns = int(input("Enter the number of columns (m): "))
+            if len(sys.argv) >= 3:
+                rows, columns = int(sys.argv[1]), int(sys.argv[2])
+            else:
+                rows = int(input("Enter the number of rows (n): "))
+                columns = int(input("Enter the number of columns (m): "))
         except ValueError:
             print("Invalid input for rows or columns. Please enter integers.")
             exit(1)
+        if rows < 1 or columns < 1:
+            print("Rows and columns must both be at least 1.")
+            exit(1)
 
         # Calculate the total number of cameras needed based on grid size
         total_needed_cameras = rows * columns
@@ -1,177 +1,83 @@
-import gi
 import configparser
-import re
+import os
+import sys
 
-# Import GStreamer bindings for Python
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GLib
+# The compositor grid and its camera handling are shared by the grid players
+# and live in multicam_common.py at the repository root (importing it also
+# initializes GStreamer)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from multicam_common import CompositorGridPlayer, camera_source_url, parse_latency
 
-class MultiCameraRTSPPlayer:
+class MultiCameraRTSPPlayer(CompositorGridPlayer):
     """
     A class to dynamically access and display multiple RTSP camera streams
     in a grid layout using GStreamer.
     """
-    def __init__(self, cameras, rows, columns):
+    def __init__(self, cameras, rows, columns, display_size=None):
         """
         Initialize the MultiCameraRTSPPlayer.
 
-        :param cameras: List of RTSP camera URLs.
+        :param cameras: List of (RTSP camera URL, latency in ms) tuples.
         :param rows: Number of rows in the grid layout.
         :param columns: Number of columns in the grid layout.
+        :param display_size: Optional (width, height) of the displayed output; defaults to the size of the grid.
         """
-        # Initialize GStreamer
-        Gst.init(None)
+        super().__init__(rows, columns, display_size)
 
-        self.rows = rows
-        self.columns = columns
-        self.cameras = cameras
+        # Parse the camera URLs once and keep each field in its own list, so
+        # every pass over the cameras only walks the field it needs. The
+        # stream path and query of each URL are kept. Cameras beyond the grid
+        # are never shown.
+        shown = cameras[:rows * columns]
+        parsed = [camera_source_url(camera_url) for camera_url, _ in shown]
+        self.urls = [rtsp_url for rtsp_url, _ in parsed]
+        self.ips = [ip_address for _, ip_address in parsed]
+        self.latencies = [latency for _, latency in shown]
 
-        # Build the GStreamer pipeline dynamically
-        pipeline_str = self.build_pipeline()
-        print(f"Pipeline: {pipeline_str}")
-
-        # Create the GStreamer pipeline from the generated string
-        self.pipeline = Gst.parse_launch(pipeline_str)
-
-        # Set up the GStreamer bus to listen for messages
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect("message", self.on_message)
-
-    def build_pipeline(self):
-        """
-        Constructs the GStreamer pipeline string based on the number of cameras
-        and the grid layout configuration.
-
-        :return: GStreamer pipeline string.
-        """
-        sources = ""  # Holds the source elements for each camera
-        sinks = ""    # Holds the sink configuration for the grid layout
-
-        # Calculate the total number of cameras based on grid size (rows × columns)
-        camera_count = self.rows * self.columns
-
-        for i in range(camera_count):
-            if i >= len(self.cameras):  # Stop if there are not enough cameras
-                break
-            
-            # Parse the camera URL into username, password, and IP address
-            camera_url = self.cameras[i]
-            username, password, ip_address = self.parse_camera_url(camera_url)
-            
-            # Construct the RTSP source for each camera
-            rtsp_url = f"rtsp://{username}:{password}@{ip_address}"
-            sources += (
-                f'rtspsrc location="{rtsp_url}" latency=200 ! '
-                f'rtph265depay ! h265parse ! nvv4l2decoder ! videoconvert ! '
-                f'comp.sink_{i} '
-            )
-            
-            # Calculate the grid position for the current camera
-            xpos = (i % self.columns) * 640  # Horizontal position
-            ypos = (i // self.columns) * 360  # Vertical position
-
-            # Define sink properties for the grid layout
-            sinks += (
-                f'sink_{i}::xpos={xpos} sink_{i}::ypos={ypos} '
-                f'sink_{i}::width=640 sink_{i}::height=360 '
-            )
-        
-        # Combine sources and sinks to form the complete pipeline
-        pipeline_str = f'{sources}nvcompositor name=comp {sinks}! nv3dsink'
-        return pipeline_str
-
-    def parse_camera_url(self, url):
-        """
-        Parse the RTSP URL into username, password, and IP address.
-
-        :param url: RTSP camera URL.
-        :return: Tuple containing (username, password, ip_address).
-        """
-        pattern = r"rtsp://([^:]+):([^@]+)@([^\s/]+)"
-        match = re.match(pattern, url)
-        if match:
-            username = match.group(1)
-            password = match.group(2)
-            ip_address = match.group(3)
-            return username, password, ip_address
-        else:
-            raise ValueError(f"Invalid camera URL format: {url}")
-
-    def on_message(self, bus, message):
-        """
-        Handle messages from the GStreamer bus, such as errors and end-of-stream events.
-
-        :param bus: The GStreamer bus.
-        :param message: The message received from the bus.
-        """
-        msg_type = message.type
-        if msg_type == Gst.MessageType.EOS:
-            # End-of-stream (EOS) event
-            print("End-of-stream (EOS) received. Shutting down...")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-        elif msg_type == Gst.MessageType.ERROR:
-            # Error event
-            err, debug_info = message.parse_error()
-            print(f"Error: {err}, Debug info: {debug_info}")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-
-    def start(self):
-        """
-        Start the GStreamer pipeline and run the GLib main loop to keep the application running.
-        """
-        # Set the pipeline to the PLAYING state
-        self.pipeline.set_state(Gst.State.PLAYING)
-        print("Pipeline started, playing the RTSP streams...")
-        
-        # Start the GLib main loop to keep the application running
-        self.loop = GLib.MainLoop()
-        try:
-            self.loop.run()
-        except KeyboardInterrupt:
-            # Gracefully handle Ctrl+C interruption
-            print("\nKeyboard interrupt received, stopping the pipeline...")
-            self.quit_main_loop()
-
-    def quit_main_loop(self):
-        """
-        Stop the GLib main loop and reset the GStreamer pipeline to NULL state.
-        """
-        if hasattr(self, 'loop'):
-            self.loop.quit()  # Quit the GLib main loop
-        self.pipeline.set_state(Gst.State.NULL)  # Stop the GStreamer pipeline
-        print("Pipeline stopped and GLib main loop exited.")
+        for i in range(len(self.ips)):
+            self.add_camera(self.urls[i], self.ips[i], i, self.latencies[i])
 
 def read_config(file_path):
     """
     Reads the camera URLs and grid configuration from the `config.ini` file.
 
     :param file_path: Path to the config.ini file.
-    :return: Tuple containing a list of camera URLs, number of rows, and number of columns.
+    :return: Tuple containing a list of (camera URL, latency) tuples, number of rows, number of columns,
+             and the (width, height) display size or None when it is not configured.
     """
-    config = configparser.ConfigParser()
+    # Interpolation is disabled so '%' in camera passwords is taken literally
+    config = configparser.ConfigParser(interpolation=None)
     cameras = []
     rows = 0
     columns = 0
+    display_size = None
 
     try:
         # Read the configuration file
         config.read(file_path)
         
-        # Extract camera URLs from the [resources] section
-        for key in config['resources']:
-            cameras.append(config['resources'][key])
+        # Extract camera URLs from the [resources] section, with an optional
+        # per-camera latency (ms) from the [latency] section under the same key;
+        # a missing or invalid entry falls back to the default for that camera only
+        latencies = dict(config.items('latency')) if config.has_section('latency') else {}
+        cameras = [
+            (url, parse_latency(latencies.get(key, ""), f"[latency] {key}"))
+            for key, url in config.items('resources')
+        ]
         
         # Extract grid configuration from the [grid] section
-        rows = int(config['grid'].get('rows', 1))  # Default to 1 row
-        columns = int(config['grid'].get('columns', 1))  # Default to 1 column
+        grid = config['grid']
+        rows = int(grid.get('rows', 1))  # Default to 1 row
+        columns = int(grid.get('columns', 1))  # Default to 1 column
+
+        # Optional output resolution; without it the grid is shown at its own size
+        if 'display_width' in grid and 'display_height' in grid:
+            display_size = (int(grid['display_width']), int(grid['display_height']))
     
     except Exception as e:
         print(f"Error reading config file: {e}")
     
-    return cameras, rows, columns
+    return cameras, rows, columns, display_size
 
 if __name__ == "__main__":
     """
@@ -182,7 +88,7 @@ if __name__ == "__main__":
     config_file_path = 'config.ini'
     
     # Read the list of cameras and grid configuration from the config file
-    cameras, rows, columns = read_config(config_file_path)
+    cameras, rows, columns, display_size = read_config(config_file_path)
     
     if not cameras:
         print("No cameras found in the config.ini file.")
@@ -190,6 +96,12 @@ if __name__ == "__main__":
         # Inform the user about the streaming setup
         print(f"Starting stream for {len(cameras)} cameras in a {rows}x{columns} grid...")
         
-        # Create and start the MultiCameraRTSPPlayer instance
-        player = MultiCameraRTSPPlayer(cameras, rows, columns)
-        player.start()
+        # Create and start the MultiCameraRTSPPlayer instance; a grid without
+        # rows or columns or an invalid camera URL is reported like any other
+        # configuration error
+        try:
+            player = MultiCameraRTSPPlayer(cameras, rows, columns, display_size)
+        except ValueError as e:
+            print(f"Error in config file: {e}")
+        else:
+            player.start()
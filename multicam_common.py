@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+"""
+Shared building blocks for the multi-camera grid players:
+
+- Parsing and building of the camera URLs, and parsing of their configured latency.
+- MultiCameraPipelineBuilder, which builds the batched, tiled and labelled grid,
+  and BasePlayer, which runs it, for the players built from a pipeline string
+  (re-stream_of_rtsp_camera_using_GstRtspServer and textoverlay_on_the_accessed_camera).
+- CompositorGridPlayer, the nvcompositor grid built element by element, with
+  add_camera and remove_camera, for the players reading cameras from a CSV or
+  config file (accessing_4_camera_at_a_time_from_csv_file,
+  camera_streaming_with_dynamic_grid_layout and
+  camera_streaming_with_dynamic_grid_layout_using_config_file).
+"""
+
+import gi
+import sys
+from urllib.parse import quote, unquote, urlsplit
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+# Initialize GStreamer once for the whole process
+Gst.init(None)
+
+# DeepStream Python bindings, used to attach the camera labels drawn by nvdsosd
+try:
+    import pyds
+except ImportError:
+    pyds = None
+
+# Number of labels one NvDsDisplayMeta can hold (MAX_ELEMENTS_IN_DISPLAY_META)
+MAX_LABELS_PER_DISPLAY_META = 16
+
+# Default jitterbuffer latency (ms) for cameras that do not configure their own
+RTSP_LATENCY_MS = 200
+
+# Size of one compositor tile, and the caps each camera branch is scaled to
+# before it reaches the compositor
+TILE_WIDTH, TILE_HEIGHT = 640, 360
+TILE_CAPS = f"video/x-raw(memory:NVMM),width={TILE_WIDTH},height={TILE_HEIGHT},format=RGBA"
+
+
+def _split_camera_url(url):
+    """
+    Splits an RTSP URL into its credentials and the rest of the URL.
+
+    The credentials are split off at the last '@' before the rest is parsed, so
+    raw '#', '?' or '/' in a password stay part of it instead of being taken
+    as URL delimiters.
+
+    :param url: RTSP URL of the camera.
+    :return: Tuple containing (username, password, urlsplit result of the URL without credentials).
+    """
+    scheme, sep, rest = url.partition("://")
+    credentials, at, address = rest.rpartition("@")
+    username, colon, password = credentials.partition(":")
+    parsed = urlsplit(f"rtsp://{address}")
+    if scheme != "rtsp" or not (sep and at and colon and username) or not parsed.hostname:
+        raise ValueError(f"Invalid camera URL format: {url}")
+    return unquote(username), unquote(password), parsed
+
+
+def parse_camera_url(url):
+    """
+    Parses an RTSP URL into username, password, and IP address.
+
+    Credentials may be written raw (including '#', '?' or '/') or percent-encoded.
+
+    :param url: RTSP URL of the camera.
+    :return: Tuple containing (username, password, ip_address), where ip_address keeps any port.
+    """
+    username, password, parsed = _split_camera_url(url)
+    # Keep the port (and IPv6 brackets) as part of the address
+    return username, password, parsed.netloc
+
+
+def build_camera_url(username, password, ip_address, path=""):
+    """
+    Builds the RTSP URL the pipeline connects to from raw camera details.
+
+    :param username: Username for the camera.
+    :param password: Password for the camera.
+    :param ip_address: IP address of the camera, with any port.
+    :param path: Stream path of the camera, with any query.
+    :return: RTSP URL with the credentials percent-encoded.
+    """
+    return f"rtsp://{quote(username, safe='')}:{quote(password, safe='')}@{ip_address}{path}"
+
+
+def camera_source_url(url):
+    """
+    Turns a configured camera URL into the URL the pipeline connects to.
+
+    The stream path and query of the configured URL (e.g. /Streaming/Channels/101)
+    are kept.
+
+    :param url: RTSP URL of the camera.
+    :return: Tuple containing (rtsp_url, ip_address).
+    """
+    username, password, parsed = _split_camera_url(url)
+    path = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+    # Credentials come back unquoted, so build_camera_url quotes them again
+    return build_camera_url(username, password, parsed.netloc, path), parsed.netloc
+
+
+def parse_latency(value, location):
+    """
+    Parses the configured jitterbuffer latency of one camera.
+
+    An empty value means the camera does not configure its own latency. An
+    invalid one is reported and also falls back to the default, so a typo
+    only affects its own camera instead of the whole inventory.
+
+    :param value: Configured latency in milliseconds, as read from the file.
+    :param location: Where the value was read from, used in the warning.
+    :return: Latency in milliseconds.
+    """
+    value = value.strip()
+    if not value:
+        return RTSP_LATENCY_MS
+    try:
+        latency = int(value)
+    except ValueError:
+        latency = -1
+    if latency < 0:
+        print(f"Invalid latency '{value}' in {location}, using the default of {RTSP_LATENCY_MS} ms")
+        return RTSP_LATENCY_MS
+    return latency
+
+
+class MultiCameraPipelineBuilder:
+    """
+    Builds the pipeline string that decodes the cameras, tiles them into a grid
+    and labels every tile with its camera number and IP address.
+    """
+
+    def __init__(self, cameras, rows, columns, tile_width, tile_height, latency=200, output="nv3dsink"):
+        """
+        Initialize the builder.
+
+        :param cameras: List of RTSP camera URLs.
+        :param rows: Number of rows in the grid layout.
+        :param columns: Number of columns in the grid layout.
+        :param tile_width: Width of each camera tile.
+        :param tile_height: Height of each camera tile.
+        :param latency: Jitterbuffer latency (ms) of every camera.
+        :param output: Pipeline description that consumes the labelled grid.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.latency = latency
+        self.output = output
+
+        # Parse every camera URL once up front, so an invalid URL fails at
+        # startup and build only has to format the pipeline string
+        self.parsed = [camera_source_url(camera_url) for camera_url in cameras]
+
+        self.labels = []  # (text, x, y) of the label drawn on each tile
+
+    def build(self):
+        """
+        Constructs the GStreamer pipeline string based on the cameras and grid layout.
+
+        :return: GStreamer pipeline string.
+        """
+        # Pipeline fragments are collected in a list and joined once at the end
+        source_parts = []  # Holds the source pipeline for each camera
+        self.labels = []
+
+        # Only as many cameras as fit in the grid are shown; slicing caps the
+        # loop by the number of cameras available as well
+        for i, (rtsp_url, ip_address) in enumerate(self.parsed[:self.rows * self.columns]):
+            source_parts.append(self.build_camera_source(rtsp_url, i))
+
+            # The tiler places mux.sink_{i} row by row, so the tile of this
+            # camera starts at (xpos, ypos) of the tiled frame
+            row, col = divmod(i, self.columns)
+            xpos = col * self.tile_width
+            ypos = row * self.tile_height
+
+            # Label the tile in its top-left corner
+            self.labels.append((f"Camera {i + 1} - {ip_address}", xpos + 25, ypos + 25))
+
+        # Combine the sources into the full pipeline string. nvstreammux scales
+        # every camera to the tile size and batches one frame per camera, and
+        # nvmultistreamtiler draws the whole batch into the grid in a single
+        # pass instead of one blit per tile. A camera that falls behind does
+        # not stall the batch for more than batched-push-timeout (in
+        # microseconds). All labels are drawn in one nvdsosd pass on the tiled
+        # frame before it is handed to the output.
+        sources = "".join(source_parts)
+        pipeline_str = f"""
+            {sources}
+            nvstreammux name=mux batch-size={len(source_parts)} live-source=1
+                width={self.tile_width} height={self.tile_height} batched-push-timeout=40000 !
+            nvmultistreamtiler rows={self.rows} columns={self.columns}
+                width={self.columns * self.tile_width} height={self.rows * self.tile_height} !
+            nvvideoconvert ! nvdsosd name=osd display-text=1 !
+            {self.output}
+        """
+
+        # Remove excess whitespace and newlines for better readability
+        return " ".join(pipeline_str.split())
+
+    def build_camera_source(self, rtsp_url, index):
+        """
+        Builds the pipeline segment for a single camera source.
+
+        Decoded frames stay in NVMM memory and go straight into the muxer batch;
+        the camera label is drawn later by nvdsosd. Late packets are dropped by
+        the jitterbuffer inside rtspsrc, the decoder outputs frames without
+        waiting on its reorder buffer (camera streams carry no B-frames), and
+        the leaky queue keeps only the freshest frames so a slow camera cannot
+        hold back the batch. The queue also gives each camera its own
+        streaming thread, so the cameras decode in parallel.
+
+        :param rtsp_url: RTSP URL of the camera.
+        :param index: Index of the camera in the grid.
+        :return: GStreamer pipeline string for the camera source.
+        """
+        return (f'rtspsrc location="{rtsp_url}" latency={self.latency} drop-on-latency=true '
+                f'buffer-mode=auto protocols=tcp+udp ! '
+                f'rtph265depay ! h265parse ! nvv4l2decoder disable-dpb=1 ! '
+                f'queue max-size-buffers=4 max-size-time=0 max-size-bytes=0 leaky=downstream ! '
+                f'mux.sink_{index} ')
+
+
+class BasePlayer:
+    """
+    Runs a pipeline built by MultiCameraPipelineBuilder: draws the camera labels,
+    watches the bus and drives the GLib main loop.
+    """
+
+    def __init__(self, pipeline_str, labels, labels_required=False):
+        """
+        Initialize the player.
+
+        :param pipeline_str: GStreamer pipeline string with an nvdsosd named "osd".
+        :param labels: List of (text, x, y) labels drawn on the tiled frame.
+        :param labels_required: Fail at startup instead of running unlabelled when pyds is missing.
+        """
+        if pyds is None and labels_required:
+            sys.stderr.write("pyds (DeepStream Python bindings) is required to draw the camera labels.\n")
+            sys.exit(1)
+        self.labels = labels
+
+        print(f"[DEBUG] GStreamer pipeline:\n{pipeline_str}\n")
+
+        # Parse and create the GStreamer pipeline
+        self.pipeline = Gst.parse_launch(pipeline_str)
+        if not self.pipeline:
+            sys.stderr.write("Failed to create pipeline from the string.\n")
+            sys.exit(1)
+
+        # Attach the camera labels to every frame before nvdsosd draws it
+        if pyds is None:
+            print("[WARN] pyds (DeepStream Python bindings) not found, camera labels are disabled.")
+        else:
+            osd_sink_pad = self.pipeline.get_by_name("osd").get_static_pad("sink")
+            osd_sink_pad.add_probe(Gst.PadProbeType.BUFFER, self.on_osd_sink_buffer)
+
+        # Set up the GStreamer bus to listen for messages (errors, EOS, etc.)
+        self.bus = self.pipeline.get_bus()
+        self.bus.add_signal_watch()
+        self.bus.connect("message", self.on_message)
+
+    def on_osd_sink_buffer(self, pad, info):
+        """
+        Pad probe that attaches the camera labels to each frame reaching nvdsosd.
+
+        :param pad: The nvdsosd sink pad.
+        :param info: Information about the probed buffer.
+        :return: Gst.PadProbeReturn.OK so the buffer continues downstream.
+        """
+        batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(info.get_buffer()))
+        frame_list = batch_meta.frame_meta_list
+        if frame_list is None:
+            return Gst.PadProbeReturn.OK
+
+        # The tiled output is a single frame, so every label goes on the first
+        # frame meta, positioned in tiled-frame coordinates
+        frame_meta = pyds.NvDsFrameMeta.cast(frame_list.data)
+
+        # Spread the labels over as many display metas as needed
+        for start in range(0, len(self.labels), MAX_LABELS_PER_DISPLAY_META):
+            labels = self.labels[start:start + MAX_LABELS_PER_DISPLAY_META]
+            display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
+            display_meta.num_labels = len(labels)
+            for j, (text, x, y) in enumerate(labels):
+                text_params = display_meta.text_params[j]
+                text_params.display_text = text
+                text_params.x_offset = x
+                text_params.y_offset = y
+                text_params.font_params.font_name = "Sans"
+                text_params.font_params.font_size = 24
+                text_params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
+                text_params.set_bg_clr = 1
+                text_params.text_bg_clr.set(0.0, 0.0, 0.0, 0.5)
+            pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
+        return Gst.PadProbeReturn.OK
+
+    def on_message(self, bus, message):
+        """
+        Handles GStreamer bus messages for error and end-of-stream events.
+
+        :param bus: The GStreamer bus.
+        :param message: Message received from the bus.
+        """
+        msg_type = message.type
+        if msg_type == Gst.MessageType.EOS:
+            print("[INFO] End-of-stream (EOS) received. Shutting down...")
+            self.pipeline.set_state(Gst.State.NULL)
+            self.quit_main_loop()
+        elif msg_type == Gst.MessageType.ERROR:
+            err, debug_info = message.parse_error()
+            print(f"[ERROR] {err}, Debug info: {debug_info}")
+            self.pipeline.set_state(Gst.State.NULL)
+            self.quit_main_loop()
+
+    def start(self):
+        """
+        Starts the GStreamer pipeline and runs the GLib main loop.
+        """
+        self.pipeline.set_state(Gst.State.PLAYING)
+        print("[INFO] Pipeline started. Press Ctrl+C to stop...\n")
+
+        self.loop = GLib.MainLoop()
+        try:
+            self.loop.run()
+        except KeyboardInterrupt:
+            print("\n[INFO] Keyboard interrupt received. Stopping...")
+            self.quit_main_loop()
+
+    def quit_main_loop(self):
+        """
+        Stops the GLib main loop and resets the pipeline state.
+        """
+        if hasattr(self, 'loop'):
+            self.loop.quit()
+        self.pipeline.set_state(Gst.State.NULL)
+        print("[INFO] Pipeline stopped and GLib main loop exited.")
+
+
+class CompositorGridPlayer:
+    """
+    Shows RTSP cameras in a grid on one nvcompositor that is built element by
+    element and created once; cameras are attached to and detached from it
+    with add_camera and remove_camera, also while the pipeline is playing.
+    """
+
+    def __init__(self, rows, columns, display_size=None):
+        """
+        Initialize the player and build the compositor and display branch.
+
+        :param rows: Number of rows in the grid layout.
+        :param columns: Number of columns in the grid layout.
+        :param display_size: Optional (width, height) of the displayed output; defaults to the size of the grid.
+        """
+        if rows < 1 or columns < 1:
+            raise ValueError(f"The grid needs at least one row and one column, got {rows}x{columns}")
+        self.rows = rows
+        self.columns = columns
+        self.display_size = display_size or (columns * TILE_WIDTH, rows * TILE_HEIGHT)
+
+        # Tile positions of every grid slot, computed once instead of per camera.
+        # Power-of-two column counts (2, 4, 8, ...) split the slot index with a
+        # shift and a mask, any other count with a single divmod.
+        xstep, ystep = TILE_WIDTH, TILE_HEIGHT
+        slots = range(rows * columns)
+        if columns & (columns - 1) == 0:
+            shift, mask = columns.bit_length() - 1, columns - 1
+            cells = [(i >> shift, i & mask) for i in slots]
+        else:
+            cells = [divmod(i, columns) for i in slots]
+        self.xs = [column * xstep for _, column in cells]  # Horizontal position
+        self.ys = [row * ystep for row, _ in cells]  # Vertical position
+
+        # Build the compositor and display branch; the cameras are added by
+        # the players with add_camera
+        self.build_pipeline()
+
+        # Set once a shutdown has been queued so repeated messages do not queue another
+        self._shutdown_pending = False
+
+        # Set up the GStreamer bus to listen for messages
+        self.bus = self.pipeline.get_bus()
+        self.bus.add_signal_watch()
+        self.bus.connect("message", self.on_message)
+
+    def build_pipeline(self):
+        """
+        Constructs the compositor and display branch of the GStreamer pipeline
+        element by element.
+
+        The compositor is created once; cameras are then attached to and
+        detached from it with add_camera and remove_camera.
+        """
+        self.pipeline = Gst.Pipeline.new("multicam")
+        self.sources = {}  # Maps a camera's RTSP URL to its (uridecodebin, tee)
+        self.tiles = {}  # Maps a grid slot to the (key, elements, tee_pad, sink_pad) of its tile
+        self.releasing = set()  # Slots whose removed tile has not been torn down yet
+        self.source_count = 0  # Number of camera streams created so far, used to name them
+        self.max_latency = 0
+
+        # Compositor and display branch shared by every camera; they stay in place
+        # while cameras are added and removed
+        self.comp = self.make_element("nvcompositor", "comp")
+
+        # The compositor would otherwise only output the bounding box of the
+        # tiles present, so a partly filled grid would get stretched below;
+        # pin its output to the full grid
+        grid_caps = self.make_element("capsfilter", "grid_caps")
+        grid_caps.set_property("caps", Gst.Caps.from_string(
+            f"video/x-raw(memory:NVMM),width={self.columns * TILE_WIDTH},height={self.rows * TILE_HEIGHT}"))
+
+        # Scale the composited frame once on the VIC to the display size, so
+        # nv3dsink shows it without rescaling
+        width, height = self.display_size
+        scale = self.make_element("nvvidconv", "scale")
+        display_caps = self.make_element("capsfilter", "display_caps")
+        display_caps.set_property("caps", Gst.Caps.from_string(
+            f"video/x-raw(memory:NVMM),width={width},height={height}"))
+
+        # sync=false renders each frame as soon as it is composited instead of
+        # waiting on the clock, which only adds latency for live cameras
+        sink = self.make_element("nv3dsink", "sink")
+        sink.set_property("sync", False)
+        sink.set_property("window-width", width)
+        sink.set_property("window-height", height)
+
+        for element in (self.comp, grid_caps, scale, display_caps, sink):
+            self.pipeline.add(element)
+        if not (self.comp.link(grid_caps) and grid_caps.link(scale)
+                and scale.link(display_caps) and display_caps.link(sink)):
+            raise RuntimeError("Failed to link nvcompositor to nv3dsink")
+
+    def add_camera(self, rtsp_url, ip_address, slot, latency=RTSP_LATENCY_MS):
+        """
+        Show a camera in a grid slot. Works on a pipeline that is already playing.
+
+        A camera that is already shown in another slot reuses its decoded stream.
+
+        :param rtsp_url: RTSP URL of the camera, including its credentials.
+        :param ip_address: IP address of the camera, as shown in the log.
+        :param slot: Index of the grid slot, which is also the compositor's sink_<slot> pad.
+        :param latency: Jitterbuffer latency for this camera, in milliseconds.
+        """
+        if not 0 <= slot < self.rows * self.columns:
+            raise ValueError(f"Slot {slot} is outside the {self.rows}x{self.columns} grid")
+        if slot in self.tiles:
+            raise ValueError(f"Slot {slot} is already showing a camera")
+        if slot in self.releasing:
+            # The old tile still holds the compositor pad and the element names
+            raise ValueError(f"Slot {slot} is still being cleared")
+
+        xpos, ypos = self.xs[slot], self.ys[slot]
+
+        # Receive and decode each unique stream once; repeated cameras share its tee
+        key = rtsp_url
+        new_source = key not in self.sources
+        if new_source:
+            self.sources[key] = self.build_camera_source(self.source_count, rtsp_url, latency)
+            self.source_count += 1
+        source, tee = self.sources[key]
+
+        # Add the tile and link it to its compositor sink pad; a camera stream
+        # created for this tile alone is removed again if the tile fails
+        try:
+            elements, tee_pad, sink_pad = self.build_tile(tee, slot, xpos, ypos)
+        except Exception:
+            if new_source:
+                del self.sources[key]
+                for element in (source, tee):
+                    element.set_state(Gst.State.NULL)
+                    self.pipeline.remove(element)
+            raise
+        self.tiles[slot] = (key, elements, tee_pad, sink_pad)
+
+        if new_source:
+            tee.sync_state_with_parent()
+            source.sync_state_with_parent()
+            if latency > self.max_latency:
+                # Let the compositor wait as long as the slowest camera's jitterbuffer
+                self.max_latency = latency
+                self.comp.set_property("latency", latency * Gst.MSECOND)
+        print(f"Camera {slot + 1}: {ip_address} at ({xpos}, {ypos})")
+
+    def remove_camera(self, slot):
+        """
+        Remove the camera shown in a grid slot while the other tiles keep playing.
+
+        The tile is torn down from the main loop, so the slot stays busy until
+        then; afterwards add_camera can fill it again.
+
+        :param slot: Index of the grid slot to clear.
+        """
+        tile = self.tiles.pop(slot, None)
+        if tile is None:
+            raise ValueError(f"Slot {slot} is not showing a camera")
+        self.releasing.add(slot)
+
+        # Unlink the tile from its tee only once no buffer is being pushed into it
+        tee_pad = tile[2]
+        tee_pad.add_probe(Gst.PadProbeType.IDLE, self.on_tile_idle, slot, tile)
+
+    def make_element(self, factory_name, name):
+        """
+        Create a GStreamer element, failing loudly if its plugin is missing.
+
+        :param factory_name: Name of the GStreamer element factory.
+        :param name: Unique name for the element within the pipeline.
+        :return: The created Gst.Element.
+        """
+        element = Gst.ElementFactory.make(factory_name, name)
+        if element is None:
+            raise RuntimeError(f"Failed to create GStreamer element '{factory_name}'")
+        return element
+
+    def build_camera_source(self, index, rtsp_url, latency):
+        """
+        Adds the receiving and decoding elements for one unique camera stream.
+
+        The decoded video goes into a tee, so a camera shown in several tiles
+        is still received and decoded only once.
+
+        :param index: Index of the unique camera stream.
+        :param rtsp_url: RTSP URL of the camera.
+        :param latency: Jitterbuffer latency for this camera, in milliseconds.
+        :return: The (uridecodebin, tee) elements of the camera.
+        """
+        # uridecodebin plugs the hardware decoder matching the stream (H.264 or H.265)
+        # and only exposes the video pad
+        source = self.make_element("uridecodebin", f"src_{index}")
+        source.set_property("uri", rtsp_url)
+        source.set_property("caps", Gst.Caps.from_string("video/x-raw(ANY)"))
+        source.set_property("expose-all-streams", False)
+        source.connect("source-setup", self.on_source_setup, latency)
+
+        # A camera shown in a single tile leaves the tee without a linked
+        # branch while that tile is removed; keep streaming instead of
+        # failing with not-linked, which would stop the whole pipeline
+        tee = self.make_element("tee", f"tee_{index}")
+        tee.set_property("allow-not-linked", True)
+        self.pipeline.add(source)
+        self.pipeline.add(tee)
+
+        # The decoded video pad only appears once the stream has been negotiated
+        source.connect("pad-added", self.on_pad_added, tee)
+        return source, tee
+
+    def build_tile(self, tee, slot, xpos, ypos):
+        """
+        Adds one grid tile fed from a camera's tee and links it to its compositor sink pad.
+
+        :param tee: The tee carrying the camera's decoded video.
+        :param slot: Index of the tile in the grid.
+        :param xpos: Horizontal position of the tile in the composited frame.
+        :param ypos: Vertical position of the tile in the composited frame.
+        :return: The tile's (queue, nvvidconv, capsfilter) elements, its tee pad and its compositor pad.
+        """
+        # The leaky queue drops stale frames so a slow camera cannot stall the compositor
+        queue = self.make_element("queue", f"queue_{slot}")
+        queue.set_property("max-size-buffers", 4)
+        queue.set_property("max-size-bytes", 0)
+        queue.set_property("max-size-time", 0)
+        Gst.util_set_object_arg(queue, "leaky", "downstream")
+
+        # nvvidconv scales the tile on the VIC so the compositor only blits it
+        convert = self.make_element("nvvidconv", f"conv_{slot}")
+        capsfilter = self.make_element("capsfilter", f"caps_{slot}")
+        capsfilter.set_property("caps", Gst.Caps.from_string(TILE_CAPS))
+
+        elements = (queue, convert, capsfilter)
+        added = []
+        sink_pad = tee_pad = None
+        try:
+            for element in elements:
+                if not self.pipeline.add(element):
+                    raise RuntimeError(f"Failed to add {element.get_name()} to the pipeline")
+                added.append(element)
+            if not (queue.link(convert) and convert.link(capsfilter)):
+                raise RuntimeError(f"Failed to link the elements for tile {slot + 1}")
+
+            # Request the compositor pad for this tile and place it on the grid
+            sink_pad = self.comp.get_request_pad(f"sink_{slot}")
+            if sink_pad is None:
+                raise RuntimeError(f"Failed to request compositor pad sink_{slot}")
+            sink_pad.set_property("xpos", xpos)
+            sink_pad.set_property("ypos", ypos)
+            if capsfilter.get_static_pad("src").link(sink_pad) != Gst.PadLinkReturn.OK:
+                raise RuntimeError(f"Failed to link tile {slot + 1} to the compositor")
+
+            # Bring the tile up to the pipeline's state, downstream first, before any
+            # data can reach it; this is a no-op while the pipeline is still NULL
+            for element in reversed(elements):
+                element.sync_state_with_parent()
+
+            # Branch off the camera's tee
+            tee_pad = tee.get_request_pad("src_%u")
+            if tee_pad is None or tee_pad.link(queue.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
+                raise RuntimeError(f"Failed to link tile {slot + 1} to {tee.get_name()}")
+        except Exception:
+            # Undo the partly built tile, so the slot and its element names can
+            # be used again and the compositor does not wait on a dead pad
+            if tee_pad is not None:
+                tee.release_request_pad(tee_pad)
+            if sink_pad is not None:
+                self.comp.release_request_pad(sink_pad)
+            for element in added:
+                element.set_state(Gst.State.NULL)
+                self.pipeline.remove(element)
+            raise
+        return elements, tee_pad, sink_pad
+
+    def on_tile_idle(self, tee_pad, info, slot, tile):
+        """
+        Pad probe that unlinks a removed tile from its tee between two buffers.
+
+        If the pad is already idle the probe fires right away, inside
+        remove_camera on the calling (main loop) thread; otherwise it fires on
+        the camera's streaming thread once the current buffer has been pushed.
+        It only unlinks the tile, which is safe in both contexts.
+
+        :param tee_pad: The tee source pad feeding the tile.
+        :param info: Information about the probe.
+        :param slot: Index of the grid slot the tile was shown in.
+        :param tile: The (key, elements, tee_pad, sink_pad) entry of the removed tile.
+        :return: Gst.PadProbeReturn.REMOVE so the probe only fires once.
+        """
+        elements = tile[1]
+        queue_sink = elements[0].get_static_pad("sink")
+        if tee_pad.get_peer() == queue_sink:
+            tee_pad.unlink(queue_sink)
+
+        # A streaming thread must not change its own elements' state, so the
+        # teardown is always queued on the main loop, also when this probe ran
+        # synchronously there, which keeps it out of remove_camera's caller
+        GLib.idle_add(self.release_tile, slot, tile)
+        return Gst.PadProbeReturn.REMOVE
+
+    def release_tile(self, slot, tile):
+        """
+        Idle callback that removes an unlinked tile and gives its pads back.
+
+        The camera's stream is removed too once no other tile shows it, and the
+        slot can be filled again afterwards.
+
+        :param slot: Index of the grid slot the tile was shown in.
+        :param tile: The (key, elements, tee_pad, sink_pad) entry of the removed tile.
+        :return: False so the callback runs only once.
+        """
+        key, elements, tee_pad, sink_pad = tile
+        for element in elements:
+            element.set_state(Gst.State.NULL)
+            self.pipeline.remove(element)
+        self.comp.release_request_pad(sink_pad)
+
+        source, tee = self.sources[key]
+        tee.release_request_pad(tee_pad)
+        if not any(tile_key == key for tile_key, *_ in self.tiles.values()):
+            del self.sources[key]
+            for element in (source, tee):
+                element.set_state(Gst.State.NULL)
+                self.pipeline.remove(element)
+        self.releasing.discard(slot)
+        return False
+
+    def on_source_setup(self, uridecodebin, source, latency):
+        """
+        Configure the rtspsrc created inside a uridecodebin.
+
+        Frames are timestamped from the camera's NTP clock and released in
+        sync across cameras, so the compositor can align the tiles. Late
+        packets are dropped instead of growing the delay.
+
+        :param uridecodebin: The uridecodebin that created the source.
+        :param source: The newly created source element.
+        :param latency: Jitterbuffer latency for this camera, in milliseconds.
+        """
+        source.set_property("latency", latency)
+        source.set_property("ntp-sync", True)
+        source.set_property("drop-on-latency", True)
+        Gst.util_set_object_arg(source, "buffer-mode", "synced")
+        Gst.util_set_object_arg(source, "protocols", "tcp")
+
+    def on_pad_added(self, uridecodebin, pad, tee):
+        """
+        Link the decoded video pad of a uridecodebin to the camera's tee.
+
+        :param uridecodebin: The uridecodebin that exposed the pad.
+        :param pad: The newly exposed source pad.
+        :param tee: The tee that distributes the camera's decoded video.
+        """
+        sink_pad = tee.get_static_pad("sink")
+        if sink_pad.is_linked():
+            return
+        if pad.link(sink_pad) != Gst.PadLinkReturn.OK:
+            print(f"Error: Failed to link {uridecodebin.get_name()} to {tee.get_name()}")
+
+    def on_message(self, bus, message):
+        """
+        Handle messages from the GStreamer bus, such as errors and end-of-stream events.
+
+        :param bus: The GStreamer bus.
+        :param message: The message received from the bus.
+        """
+        msg_type = message.type
+        if msg_type == Gst.MessageType.EOS:
+            # End-of-stream (EOS) event
+            print("End-of-stream (EOS) received. Shutting down...")
+            self.schedule_shutdown()
+        elif msg_type == Gst.MessageType.ERROR:
+            # Error event
+            err, debug_info = message.parse_error()
+            print(f"Error: {err}, Debug info: {debug_info}")
+            self.schedule_shutdown()
+
+    def schedule_shutdown(self):
+        """
+        Queue the pipeline shutdown on the GLib main loop.
+
+        Taking many RTSP sources to NULL can block for seconds, so it is done
+        from an idle callback instead of inside the bus handler.
+        """
+        if self._shutdown_pending:
+            return
+        self._shutdown_pending = True
+        GLib.idle_add(self._shutdown)
+
+    def _shutdown(self):
+        """
+        Idle callback that stops the pipeline and the main loop.
+
+        :return: False so the callback runs only once.
+        """
+        self.quit_main_loop()
+        return False
+
+    def start(self):
+        """
+        Start the GStreamer pipeline and run the GLib main loop to keep the application running.
+        """
+        # Set the pipeline to the PLAYING state
+        self.pipeline.set_state(Gst.State.PLAYING)
+        print("Pipeline started, playing the RTSP streams...")
+        
+        # Start the GLib main loop to keep the application running
+        self.loop = GLib.MainLoop()
+        try:
+            self.loop.run()
+        except KeyboardInterrupt:
+            # Gracefully handle Ctrl+C interruption
+            print("\nKeyboard interrupt received, stopping the pipeline...")
+            self.quit_main_loop()
+
+    def quit_main_loop(self):
+        """
+        Stop the GLib main loop and reset the GStreamer pipeline to NULL state.
+        """
+        if hasattr(self, 'loop'):
+            self.loop.quit()  # Quit the GLib main loop
+        self.pipeline.set_state(Gst.State.NULL)  # Stop the GStreamer pipeline
+        print("Pipeline stopped and GLib main loop exited.")
@@ -2,14 +2,23 @@
 
 import gi
 import configparser
-import re
+import os
 import sys
 
 gi.require_version('Gst', '1.0')
 gi.require_version("GstRtspServer", "1.0")
-from gi.repository import Gst, GLib, GstRtspServer
+from gi.repository import Gst, GstRtspServer
 
-class MultiCameraRTSPPlayer:
+# The grid pipeline and player are shared by the re-stream and text-overlay
+# players and live in multicam_common.py at the repository root (importing it
+# also initializes GStreamer)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from multicam_common import BasePlayer, MultiCameraPipelineBuilder
+
+# Format of the encoded stream handed from the pipeline to the RTSP server
+ENCODED_CAPS = "video/x-h265, stream-format=byte-stream, alignment=au"
+
+class MultiCameraRTSPPlayer(BasePlayer):
     """
     This class handles the functionality to:
     - Access multiple RTSP cameras.
@@ -26,14 +35,10 @@ class MultiCameraRTSPPlayer:
         rtsp_host,
         rtsp_port,
         mount_point,
-        udp_port,
         tile_width,
         tile_height,
         encoding_bitrate
     ):
-        # Initialize GStreamer
-        Gst.init(None)
-
         # Store configuration parameters
         self.rows = rows
         self.columns = columns
@@ -43,116 +48,74 @@ class MultiCameraRTSPPlayer:
         self.rtsp_host = rtsp_host
         self.rtsp_port = rtsp_port
         self.mount_point = mount_point
-        self.udp_port = udp_port
         self.tile_width = tile_width
         self.tile_height = tile_height
         self.encoding_bitrate = encoding_bitrate
 
-        # Build the GStreamer pipeline description string
-        self.pipeline_str = self.build_pipeline()
-        print(f"[DEBUG] GStreamer pipeline:\n{self.pipeline_str}\n")
-
-        # Parse and create the GStreamer pipeline
-        self.pipeline = Gst.parse_launch(self.pipeline_str)
-        if not self.pipeline:
-            sys.stderr.write("Failed to create pipeline from the string.\n")
-            sys.exit(1)
+        # Low-latency encoder settings: the fastest (UltraFast) preset at full
+        # clocks with single-pass CBR and no B-frames. This is a live re-stream,
+        # so the higher-quality presets and B-frame reordering only add
+        # per-frame encode time and latency.
+        self.encoder_params = {
+            "preset-level": 1,  # UltraFast
+            "control-rate": 1,  # Constant bitrate
+            "bitrate": encoding_bitrate,
+            "vbv-size": encoding_bitrate // 30,  # About one frame at 30 fps
+            "iframeinterval": 30,
+            "insert-sps-pps": 1,
+            "insert-vui": 1,
+            "num-B-Frames": 0,
+            "maxperf-enable": 1,
+            "ratecontrol-enable": 1,
+            "EnableStringentBitrate": 0,
+            "EnableTwopassCBR": 0,
+            "profile": 0,  # Main
+        }
+        print(f"[INFO] NVENC parameters: {self.encoder_params}")
+
+        # Build and create the GStreamer pipeline. The camera URLs are parsed
+        # once by the builder, so an invalid URL fails at startup.
+        self.builder = MultiCameraPipelineBuilder(
+            cameras, rows, columns, tile_width, tile_height,
+            latency=50, output=self.build_output()
+        )
+        super().__init__(self.builder.build(), self.builder.labels)
 
-        # Set up the GStreamer bus to listen for messages (errors, EOS, etc.)
-        self.bus = self.pipeline.get_bus()
-        self.bus.add_signal_watch()
-        self.bus.connect("message", self.on_message)
+        # Hand the encoded frames to the RTSP server in-process; the appsrc is
+        # only set while the server's media is prepared
+        self.appsrc = None
+        self.waiting_for_keyframe = True
+        encoder_sink = self.pipeline.get_by_name("encsink")
+        encoder_sink.connect("new-sample", self.on_encoded_sample)
 
         # Set up the internal RTSP server
         self.setup_rtsp_server()
 
-    def build_pipeline(self):
+    def build_output(self):
         """
-        Constructs a GStreamer pipeline string to:
-        - Create N camera sources (RTSP streams).
-        - Composite them into a grid using nvcompositor.
-        - Tee the output for local display and RTSP re-streaming.
-        
+        Constructs the part of the pipeline string that consumes the labelled grid:
+        - Display it locally.
+        - Encode it and hand it to the RTSP server.
+
         Returns:
             str: The GStreamer pipeline string.
         """
-
-        sources = ""  # Holds the source pipeline for each camera
-        sinks_positions = ""  # Specifies the compositor sink positions for each camera
-
-        # Determine the total number of cameras to fit in the grid
-        camera_count = self.rows * self.columns
-
-        for i in range(camera_count):
-            if i >= len(self.cameras):
-                break
-
-            # Parse camera info (username, password, and IP address)
-            camera_url = self.cameras[i]
-            username, password, ip_address = self.parse_camera_url(camera_url)
-            rtsp_url = f"rtsp://{username}:{password}@{ip_address}"
-
-            # Build the pipeline segment for this camera
-            sources += (
-                f'rtspsrc location="{rtsp_url}" latency=50 ! '
-                f'rtph265depay ! h265parse ! nvv4l2decoder ! nvvideoconvert ! '
-                f'textoverlay text="Camera {i+1} - {ip_address}" '
-                f'valignment=top halignment=left font-desc="Sans, 24" ! '
-                f'nvvideoconvert ! comp.sink_{i} '
-            )
-
-            # Define the grid position (x, y, width, height) for this camera
-            xpos = (i % self.columns) * self.tile_width
-            ypos = (i // self.columns) * self.tile_height
-            sinks_positions += (
-                f'sink_{i}::xpos={xpos} '
-                f'sink_{i}::ypos={ypos} '
-                f'sink_{i}::width={self.tile_width} '
-                f'sink_{i}::height={self.tile_height} '
-            )
-
-        # Combine sources and sinks into the full pipeline string
-        pipeline_str = f"""
-            {sources}
-            nvcompositor name=comp {sinks_positions} !
-            nvvideoconvert ! tee name=t
+        # The labelled grid is converted once to NV12 in NVMM memory, which
+        # both nv3dsink and the encoder accept, so the tee branches need no
+        # further conversion
+        encoder_props = " ".join(f"{name}={value}" for name, value in self.encoder_params.items())
+        return f"""
+            nvvideoconvert ! video/x-raw(memory:NVMM), format=NV12 ! tee name=t
 
             t. ! queue !
-                 nvvideoconvert !
                  nv3dsink
 
             t. ! queue max-size-buffers=1 leaky=downstream !
-                 nvvideoconvert !
-                 video/x-raw(memory:NVMM), format=NV12 !
-                 nvv4l2h265enc bitrate={self.encoding_bitrate} iframeinterval=30 insert-sps-pps=1 preset-level=1 !
-                 rtph265pay !
-                 udpsink host=127.0.0.1 port={self.udp_port} sync=false async=false
+                 nvv4l2h265enc {encoder_props} !
+                 h265parse config-interval=-1 ! {ENCODED_CAPS} !
+                 appsink name=encsink emit-signals=true sync=false max-buffers=2 drop=true
         """
 
-        # Remove excess whitespace and newlines for better readability
-        pipeline_str = " ".join(pipeline_str.split())
-        return pipeline_str
-
-    def parse_camera_url(self, url):
-        """
-        Parses an RTSP URL to extract the username, password, and IP address.
-
-        Args:
-            url (str): RTSP URL of the camera.
-
-        Returns:
-            tuple: (username, password, ip_address)
-        """
-        pattern = r"rtsp://([^:]+):([^@]+)@([^\s/]+)"
-        match = re.match(pattern, url)
-        if match:
-            username = match.group(1)
-            password = match.group(2)
-            ip_address = match.group(3)
-            return username, password, ip_address
-        else:
-            raise ValueError(f"Invalid camera URL format: {url}")
-
     def setup_rtsp_server(self):
         """
         Sets up an internal RTSP server to publish the composited video stream.
@@ -162,14 +125,25 @@ class MultiCameraRTSPPlayer:
         self.server.set_service(str(self.rtsp_port))
         self.server.attach(None)
 
-        # Configure the RTSP media factory
+        # Configure the RTSP media factory. It payloads the already encoded
+        # frames pushed into its appsrc, so every client shares the one encoder.
+        # The appsrc never blocks the encoder branch (a paused or not yet
+        # playing media would otherwise stall it, and with it the shutdown).
+        # Instead on_encoded_sample stops pushing once about four frames (at
+        # 30 fps) are queued, and resumes at the next keyframe.
+        self.max_queued_bytes = self.encoding_bitrate // 60
         factory = GstRtspServer.RTSPMediaFactory.new()
         factory.set_launch(
-            f"( udpsrc name=pay0 port={self.udp_port} buffer-size=524288 "
-            f"caps=\"application/x-rtp, media=video, clock-rate=90000, encoding-name=H265, payload=96\" )"
+            f"( appsrc name=src is-live=true format=time do-timestamp=true "
+            f"block=false max-bytes={self.max_queued_bytes} caps=\"{ENCODED_CAPS}\" ! "
+            f"rtph265pay name=pay0 pt=96 config-interval=-1 )"
         )
+        factory.connect("media-configure", self.on_media_configure)
         factory.set_shared(True)
         factory.set_eos_shutdown(False)  # Prevent shutdown on client disconnection
+        # Keep the media running between clients so a reconnect does not
+        # renegotiate the stream
+        factory.set_suspend_mode(GstRtspServer.RTSPSuspendMode.NONE)
 
         # Add the factory to the RTSP server's mount points
         mount_points = self.server.get_mount_points()
@@ -177,47 +151,65 @@ class MultiCameraRTSPPlayer:
 
         print(f"[INFO] RTSP server launched at rtsp://{self.rtsp_host}:{self.rtsp_port}{self.mount_point}")
 
-    def on_message(self, bus, message):
+    def on_media_configure(self, factory, media):
         """
-        Handles GStreamer bus messages for error and end-of-stream events.
+        Picks up the appsrc of the RTSP media once it is created for a client.
 
         Args:
-            bus (Gst.Bus): The GStreamer bus.
-            message (Gst.Message): The received message.
+            factory (GstRtspServer.RTSPMediaFactory): The factory that created the media.
+            media (GstRtspServer.RTSPMedia): The newly created media.
         """
-        msg_type = message.type
-        if msg_type == Gst.MessageType.EOS:
-            print("[INFO] End-of-stream (EOS) received. Shutting down...")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-        elif msg_type == Gst.MessageType.ERROR:
-            err, debug_info = message.parse_error()
-            print(f"[ERROR] {err}, Debug info: {debug_info}")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
-
-    def start(self):
-        """
-        Starts the GStreamer pipeline and runs the GLib main loop.
+        # A new media can only start decoding at a keyframe
+        self.waiting_for_keyframe = True
+        self.appsrc = media.get_element().get_by_name_recurse_up("src")
+        media.connect("unprepared", self.on_media_unprepared)
+
+    def on_media_unprepared(self, media):
         """
-        self.pipeline.set_state(Gst.State.PLAYING)
-        print("[INFO] Pipeline started. Press Ctrl+C to stop...\n")
+        Stops feeding the RTSP media once it is torn down.
 
-        self.loop = GLib.MainLoop()
-        try:
-            self.loop.run()
-        except KeyboardInterrupt:
-            print("\n[INFO] Keyboard interrupt received. Stopping...")
-            self.quit_main_loop()
+        Args:
+            media (GstRtspServer.RTSPMedia): The media that was unprepared.
+        """
+        self.appsrc = None
 
-    def quit_main_loop(self):
+    def on_encoded_sample(self, appsink):
         """
-        Stops the GLib main loop and resets the pipeline state.
+        Forwards an encoded frame from the pipeline to the RTSP media.
+
+        Args:
+            appsink (Gst.Element): The appsink at the end of the encoder branch.
+
+        Returns:
+            Gst.FlowReturn: OK, so the pipeline keeps running without clients.
         """
-        if hasattr(self, 'loop'):
-            self.loop.quit()
-        self.pipeline.set_state(Gst.State.NULL)
-        print("[INFO] Pipeline stopped and GLib main loop exited.")
+        sample = appsink.emit("pull-sample")
+        appsrc = self.appsrc
+        if sample is None or appsrc is None:
+            return Gst.FlowReturn.OK
+
+        # While the media is not draining (a paused client, or a media that
+        # is prepared but not playing yet) frames are dropped rather than
+        # queued. Dropping an encoded frame breaks the frames that refer to
+        # it, so once anything was dropped the push only resumes at the next
+        # keyframe, which carries the parameter sets as well: clients see a
+        # short freeze of at most one keyframe interval instead of corruption.
+        encoded = sample.get_buffer()
+        if appsrc.get_property("current-level-bytes") >= self.max_queued_bytes:
+            self.waiting_for_keyframe = True
+            return Gst.FlowReturn.OK
+        if self.waiting_for_keyframe:
+            if encoded.has_flags(Gst.BufferFlags.DELTA_UNIT):
+                return Gst.FlowReturn.OK
+            self.waiting_for_keyframe = False
+
+        # The media runs on its own clock, so the shallow copy (which shares
+        # the encoded data) is timestamped by the appsrc on arrival instead
+        buffer = encoded.copy()
+        buffer.pts = Gst.CLOCK_TIME_NONE
+        buffer.dts = Gst.CLOCK_TIME_NONE
+        appsrc.emit("push-buffer", buffer)
+        return Gst.FlowReturn.OK
 
 
 def read_config(file_path):
@@ -230,7 +222,8 @@ def read_config(file_path):
     Returns:
         tuple: Configuration parameters needed for the player.
     """
-    config = configparser.ConfigParser()
+    # Interpolation is disabled so '%' in camera passwords is taken literally
+    config = configparser.ConfigParser(interpolation=None)
     cameras = []
     rows = 0
     columns = 0
@@ -239,7 +232,6 @@ def read_config(file_path):
     rtsp_host = "127.0.0.1"
     rtsp_port = 8554
     mount_point = "/multicam"
-    udp_port = 5400
     tile_width = 320
     tile_height = 180
     encoding_bitrate = 1000000
@@ -249,23 +241,23 @@ def read_config(file_path):
 
         # -- [resources] section (camera URLs) --
         if 'resources' in config:
-            for key in config['resources']:
-                cameras.append(config['resources'][key])
+            cameras = [url for _, url in config.items('resources')]
 
         # -- [grid] section (rows/columns) --
         if 'grid' in config:
-            rows = int(config['grid'].get('rows', 1))
-            columns = int(config['grid'].get('columns', 1))
+            grid = config['grid']
+            rows = int(grid.get('rows', 1))
+            columns = int(grid.get('columns', 1))
 
         # -- [stream] section (network & pipeline params) --
         if 'stream' in config:
-            rtsp_host = config['stream'].get('rtsp_host', rtsp_host)
-            rtsp_port = config['stream'].getint('rtsp_port', rtsp_port)
-            mount_point = config['stream'].get('mount_point', mount_point)
-            udp_port = config['stream'].getint('udp_port', udp_port)
-            tile_width = config['stream'].getint('tile_width', tile_width)
-            tile_height = config['stream'].getint('tile_height', tile_height)
-            encoding_bitrate = config['stream'].getint('encoding_bitrate', encoding_bitrate)
+            stream = config['stream']
+            rtsp_host = stream.get('rtsp_host', rtsp_host)
+            rtsp_port = stream.getint('rtsp_port', rtsp_port)
+            mount_point = stream.get('mount_point', mount_point)
+            tile_width = stream.getint('tile_width', tile_width)
+            tile_height = stream.getint('tile_height', tile_height)
+            encoding_bitrate = stream.getint('encoding_bitrate', encoding_bitrate)
 
     except Exception as e:
         print(f"[ERROR] Error reading config file: {e}")
@@ -278,7 +270,6 @@ def read_config(file_path):
         rtsp_host,
         rtsp_port,
         mount_point,
-        udp_port,
         tile_width,
         tile_height,
         encoding_bitrate
@@ -297,7 +288,6 @@ if __name__ == "__main__":
         rtsp_host,
         rtsp_port,
         mount_point,
-        udp_port,
         tile_width,
         tile_height,
         encoding_bitrate
@@ -307,16 +297,20 @@ if __name__ == "__main__":
         print("[WARN] No cameras found in the config.ini file.")
     else:
         print(f"[INFO] Starting composited stream for {len(cameras)} camera(s) in a {rows}x{columns} grid...")
-        player = MultiCameraRTSPPlayer(
-            cameras,
-            rows,
-            columns,
-            rtsp_host,
-            rtsp_port,
-            mount_point,
-            udp_port,
-            tile_width,
-            tile_height,
-            encoding_bitrate
-        )
-        player.start()
+        # An invalid camera URL is reported like any other configuration error
+        try:
+            player = MultiCameraRTSPPlayer(
+                cameras,
+                rows,
+                columns,
+                rtsp_host,
+                rtsp_port,
+                mount_point,
+                tile_width,
+                tile_height,
+                encoding_bitrate
+            )
+        except ValueError as e:
+            print(f"[ERROR] Error in config file: {e}")
+        else:
+            player.start()
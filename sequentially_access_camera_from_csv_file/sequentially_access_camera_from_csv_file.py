@@ -5,38 +5,61 @@ import csv
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib
 
+# Initialize GStreamer once for the whole process
+Gst.init(None)
+
 class RTSPPlayer:
     """
     A class to handle RTSP streaming using GStreamer.
+
+    One pipeline and one GLib main loop are reused for every camera; only the
+    RTSP location changes from one camera to the next.
     """
-    def __init__(self, username, password, ip_address):
+    def __init__(self):
         """
-        Initialize the RTSP player with camera credentials and IP address.
-
-        :param username: Username for RTSP authentication
-        :param password: Password for RTSP authentication
-        :param ip_address: IP address of the RTSP camera
+        Initialize the RTSP player and build the GStreamer pipeline shared by all cameras.
         """
-        # Initialize GStreamer
-        Gst.init(None)
-
-        # Construct the GStreamer pipeline string using the camera details
+        # Construct the GStreamer pipeline string for the decoding chain; the
+        # RTSP source is added separately below
         pipeline_str = (
-            f"rtspsrc location=rtsp://{username}:{password}@{ip_address} ! "
-            f"rtph265depay ! h265parse ! nvv4l2decoder ! videoconvert ! nv3dsink"
+            "rtph265depay name=depay ! h265parse ! nvv4l2decoder ! videoconvert ! nv3dsink"
         )
         
         # Print the pipeline for debugging purposes
-        print(f"Pipeline: {pipeline_str}")
+        print(f"Pipeline: rtspsrc ! {pipeline_str}")
 
         # Create the GStreamer pipeline
         self.pipeline = Gst.parse_launch(pipeline_str)
+        self.depay_sink = self.pipeline.get_by_name("depay").get_static_pad("sink")
+
+        # rtspsrc removes its pads when it goes back to READY and creates new
+        # ones for the next camera, so every new pad is linked by a handler
+        # that stays connected (the one parse_launch sets up runs only once).
+        # The camera location is set per camera.
+        self.source = Gst.ElementFactory.make("rtspsrc", "src")
+        self.pipeline.add(self.source)
+        self.source.connect("pad-added", self.on_pad_added)
 
         # Set up the bus to listen for messages from the GStreamer pipeline
         self.bus = self.pipeline.get_bus()
         self.bus.add_signal_watch()
         self.bus.connect("message", self.on_message)
 
+        # The GLib main loop runs once per camera
+        self.loop = GLib.MainLoop()
+
+    def on_pad_added(self, src, pad):
+        """
+        Link a new rtspsrc pad to the depayloader, once per camera.
+
+        :param src: The rtspsrc element
+        :param pad: The newly added source pad
+        """
+        if self.depay_sink.is_linked():
+            return
+        if pad.link(self.depay_sink) != Gst.PadLinkReturn.OK:
+            print(f"Could not link {pad.get_name()} to the depayloader, skipping it.")
+
     def on_message(self, bus, message):
         """
         Handle messages from the GStreamer bus, such as errors and end-of-stream events.
@@ -47,65 +70,80 @@ class RTSPPlayer:
         msg_type = message.type
         if msg_type == Gst.MessageType.EOS:
             # End-of-stream received
-            print("End-of-stream (EOS) received. Shutting down...")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
+            print("End-of-stream (EOS) received. Moving to the next camera...")
+            self.loop.quit()
         elif msg_type == Gst.MessageType.ERROR:
             # Handle errors in the pipeline
             err, debug_info = message.parse_error()
             print(f"Error: {err}, Debug info: {debug_info}")
-            self.pipeline.set_state(Gst.State.NULL)
-            self.quit_main_loop()
+            self.loop.quit()
 
-    def start(self):
+    def play(self, username, password, ip_address):
         """
-        Start the GStreamer pipeline and enter the GLib main loop to keep the application running.
+        Stream one camera until it ends, fails or Ctrl+C is pressed.
+
+        :param username: Username for RTSP authentication
+        :param password: Password for RTSP authentication
+        :param ip_address: IP address of the RTSP camera
         """
-        # Set the pipeline to PLAYING state
+        # Going back to READY only resets the stream; the decoder and the
+        # display sink stay open for the next camera
+        self.pipeline.set_state(Gst.State.READY)
+
+        # Drop any messages still queued from the previous camera
+        self.bus.set_flushing(True)
+        self.bus.set_flushing(False)
+
+        # Point the source at the camera and start playing
+        self.source.set_property("location", f"rtsp://{username}:{password}@{ip_address}")
         self.pipeline.set_state(Gst.State.PLAYING)
         print("Pipeline started, playing the RTSP stream...")
         
-        # Start the GLib main loop to keep the application running
-        self.loop = GLib.MainLoop()
+        # Run the GLib main loop until the stream ends or fails
         try:
             self.loop.run()
         except KeyboardInterrupt:
-            # Gracefully handle Ctrl+C interruption
-            print("\nKeyboard interrupt received, stopping the pipeline...")
-            self.quit_main_loop()
+            # Ctrl+C stops the current camera and moves on to the next one
+            print("\nKeyboard interrupt received, stopping the stream...")
 
-    def quit_main_loop(self):
+    def stop(self):
         """
-        Stop the GLib main loop and reset the GStreamer pipeline to NULL state.
+        Reset the GStreamer pipeline to NULL state once all cameras have been played.
         """
-        if hasattr(self, 'loop'):
-            self.loop.quit()  # Quit the GLib main loop
         self.pipeline.set_state(Gst.State.NULL)  # Stop the GStreamer pipeline
         print("Pipeline stopped and GLib main loop exited.")
 
 def read_camera_from_csv(file_path):
     """
-    Reads the camera details from a CSV file and returns a list of tuples containing
-    the username, password, and IP address for each camera.
+    Reads the camera details from a CSV file one row at a time, so the first
+    camera can start streaming before the rest of the file is read.
 
     :param file_path: Path to the CSV file
-    :return: List of tuples with camera details
+    :return: Generator of (username, password, ip_address) tuples
     """
-    cameras = []
     try:
         # Open the CSV file
-        with open(file_path, 'r') as csv_file:
-            reader = csv.DictReader(csv_file)
-            # Read each row and extract camera details
+        with open(file_path, 'r', newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            header = next(reader, None)
+            if header is None:
+                return
+            i_user, i_pass, i_addr = header.index('username'), header.index('password'), header.index('ip_address')
+            required = max(i_user, i_pass, i_addr) + 1
+
+            # Yield the camera details of each non-empty row
             for row in reader:
-                username = row['username']
-                password = row['password']
-                ip_address = row['ip_address']
-                cameras.append((username, password, ip_address))
+                if not row:
+                    continue
+                if len(row) < required:
+                    # Skip the short row only, so the cameras after it are still played
+                    print(f"Skipping {file_path} line {reader.line_num}: "
+                          f"expected at least {required} columns, got {len(row)}")
+                    continue
+                yield row[i_user], row[i_pass], row[i_addr]
     except Exception as e:
         # Handle errors in reading the CSV file
         print(f"Error reading CSV file: {e}")
-    return cameras
 
 if __name__ == "__main__":
     """
@@ -115,15 +153,16 @@ if __name__ == "__main__":
     # Path to the CSV file containing camera details
     csv_file_path = 'cameras.csv'
     
-    # Read the list of cameras from the CSV file
-    cameras = read_camera_from_csv(csv_file_path)
-    
-    if not cameras:
+    # Play each camera as it is read from the CSV file, on one shared player
+    player = None
+    for i, (username, password, ip_address) in enumerate(read_camera_from_csv(csv_file_path), start=1):
+        if player is None:
+            player = RTSPPlayer()
+        print(f"\nStarting stream for Camera {i} ({ip_address})...")
+        player.play(username, password, ip_address)
+
+    if player is None:
         # If no cameras are found, print an error message
         print("No cameras found in the CSV file.")
     else:
-        # Loop through each camera and create a player for it
-        for i, (username, password, ip_address) in enumerate(cameras, start=1):
-            print(f"\nStarting stream for Camera {i} ({ip_address})...")
-            player = RTSPPlayer(username, password, ip_address)
-            player.start()
+        player.stop()